@@ -1,4 +1,8 @@
+import logging
+import logging.handlers
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor
 from scripts.data_quality_ckeck import DataQualityChecker, logger
 
 
@@ -8,17 +12,35 @@ def main(file_path: str) -> None:
     Args:
         file_path (str): The path to the JSON file
     """
+    base_name = os.path.basename(file_path)
+    file_name_without_extension = os.path.splitext(base_name)[0]
+    logger.info("Checking %s data quality...", file_name_without_extension)
     checker = DataQualityChecker(file_path)
-    checker.load_data()
+    checker.load_data(stream=True)
     checker.check_json_quality()
 
 
+def init_worker(queue: multiprocessing.Queue) -> None:
+    """Route the worker's log records to the parent process
+
+    Args:
+        queue (multiprocessing.Queue): The queue drained by the parent's listener
+    """
+    logging.getLogger().handlers = [logging.handlers.QueueHandler(queue)]
+
+
 if __name__ == "__main__":
     logger.info("Starting data quality check...")
     # logs created in DataQualityChecker.log
     paths = ["data/brands.json", "data/users.json", "data/receipts.json"]
-    for file_path in paths:
-        base_name = os.path.basename(file_path)
-        file_name_without_extension = os.path.splitext(base_name)[0]
-        logger.info(f"Checking {file_name_without_extension} data quality...")
-        main(file_path)
+    # Each file is checked in its own process; records are written by the parent
+    queue = multiprocessing.Queue()
+    listener = logging.handlers.QueueListener(queue, *logging.getLogger().handlers)
+    listener.start()
+    try:
+        with ProcessPoolExecutor(
+            max_workers=len(paths), initializer=init_worker, initargs=(queue,)
+        ) as executor:
+            list(executor.map(main, paths))
+    finally:
+        listener.stop()
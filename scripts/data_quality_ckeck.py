@@ -1,46 +1,193 @@
 import json
+from collections import Counter
 from datetime import datetime
+import itertools
 import logging
+import logging.handlers
 import os
-from typing import Any, Counter, Dict, List
-
+import re
+from typing import Any, Dict, Iterator, List
+
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+try:
+    import ijson
+
+    _JSON_DECODE_ERRORS = (json.JSONDecodeError, ijson.JSONError)
+except ImportError:
+    ijson = None
+    _JSON_DECODE_ERRORS = (json.JSONDecodeError,)
+
+# The file is opened on first write, so processes that import this module but
+# route their records elsewhere (see main.py) do not truncate it
+_file_handler = logging.FileHandler("DataQualityChecker.log", mode="w", delay=True)
+_file_handler.setFormatter(
+    logging.Formatter(
+        "%(asctime)s - %(levelname)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
+    )
+)
+# Records are written in batches; the buffer is drained by logging.shutdown()
+# at interpreter exit and immediately for ERROR records
 logging.basicConfig(
-    filename="DataQualityChecker.log",
-    filemode="w",
+    handlers=[
+        logging.handlers.MemoryHandler(
+            4096, flushLevel=logging.ERROR, target=_file_handler
+        )
+    ],
     level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
 )
 logger = logging.getLogger(__name__)
 
+# The fields order matter - DO NOT CHANGE!
+_DATE_FIELDS = (
+    "lastLogin",
+    "createDate",
+    "dateScanned",
+    "finishedDate",
+    "modifyDate",
+    "pointsAwardedDate",
+    "purchaseDate",
+)
+_REQUIRED_DATE_FIELDS = {
+    "receipts": frozenset(_DATE_FIELDS[1:]),
+    "users": frozenset(_DATE_FIELDS[:1]),
+}
+# Declared top-level fields of the known entities; other files infer theirs
+_ENTITY_SCHEMAS = {
+    "brands": frozenset(
+        (
+            "_id",
+            "barcode",
+            "brandCode",
+            "category",
+            "categoryCode",
+            "cpg",
+            "name",
+            "topBrand",
+        )
+    ),
+    "users": frozenset(
+        (
+            "_id",
+            "active",
+            "createdDate",
+            "lastLogin",
+            "role",
+            "signUpSource",
+            "state",
+        )
+    ),
+    "receipts": frozenset(
+        (
+            "_id",
+            "bonusPointsEarned",
+            "bonusPointsEarnedReason",
+            "createDate",
+            "dateScanned",
+            "finishedDate",
+            "modifyDate",
+            "pointsAwardedDate",
+            "pointsEarned",
+            "purchaseDate",
+            "purchasedItemCount",
+            "rewardsReceiptItemList",
+            "rewardsReceiptStatus",
+            "totalSpent",
+            "userId",
+        )
+    ),
+}
+# Records sampled to infer the expected keys of files without a declared schema
+_SCHEMA_SAMPLE_SIZE = 64
+# Epoch milliseconds before this (year 2286) convert to a datetime safely
+_MAX_TIMESTAMP_MS = 10**13
+
 
 class JsonFileReader:
     @staticmethod
     def read_json_file(file_path):
-        with open(file_path, "r") as file:
-            for line in file:
-                yield json.loads(line)
+        with open(file_path, "rb") as file:
+            if JsonFileReader.is_json_array(file):
+                # A single JSON array rather than one JSON object per line
+                if ijson is not None:
+                    yield from ijson.items(file, "item", use_float=True)
+                else:
+                    yield from _json_loads(file.read())
+            else:
+                for line in file:
+                    yield _json_loads(line)
+
+    @staticmethod
+    def is_json_array(file) -> bool:
+        """Check whether the file holds a single JSON array
+
+        Args:
+            file: A file opened in binary mode, rewound before returning
+
+        Returns:
+            bool: True if the first non-whitespace character is "["
+        """
+        char = file.read(1)
+        while char.isspace():
+            char = file.read(1)
+        file.seek(0)
+        return char == b"["
 
 
 class DataQualityChecker:
+    _NEGATIVE_FIELD_RE = re.compile(r"count|amount|price|quantity", re.IGNORECASE)
+
     def __init__(self, file_path):
         self.file_path = file_path
         self.data = None
+        self._oid_counts = Counter()
+        self._negative_items = 0
         self.entity = os.path.splitext(os.path.basename(self.file_path))[0]
+        # Field checks keyed by the exact type of the decoded JSON value
+        self._type_dispatch = {
+            int: self.check_negative_numeric_fields,
+            float: self.check_negative_numeric_fields,
+            list: self.check_empty_list,
+            type(None): self.check_null_value,
+        }
+
+    def load_data(self, stream: bool = False) -> None:
+        """Load json data from file
+
+        Args:
+            stream (bool, optional): Keep the records as a lazy iterator instead
+                of a list, so they are read while being checked. Defaults to False.
+        """
+        if stream:
+            self.data = self.iter_records()
+        else:
+            self.data = list(self.iter_records())
+
+    def iter_records(self) -> Iterator[Dict]:
+        """Iterate over the json records in the file
 
-    def load_data(self) -> None:
-        """Load json data from file"""
+        Yields:
+            Dict: The next record in the file
+        """
+        empty = True
         try:
-            self.data = list(JsonFileReader.read_json_file(self.file_path))
-        except json.JSONDecodeError:
-            logger.warning("Invalid JSON structure")
+            for record in JsonFileReader.read_json_file(self.file_path):
+                empty = False
+                yield record
+        except _JSON_DECODE_ERRORS:
+            logger.warning("Invalid JSON structure in %s", self.entity)
             raise
         except FileNotFoundError:
-            logger.error(f"File not found: {self.entity}")
+            logger.error("File not found: %s", self.entity)
             raise
 
-        if not self.data:
-            logger.warning("The file is empty")
+        if empty:
+            logger.warning("The file is empty: %s", self.entity)
 
     def find_duplicates(self, data: Dict) -> List:
         """Find duplicates in JSON
@@ -51,10 +198,19 @@ class DataQualityChecker:
         Returns:
             List: List of duplicates
         """
-        oid_values = [item["$oid"] for item in data]
-        count = Counter(oid_values)
-        duplicates = [oid for oid, freq in count.items() if freq > 1]
-        return duplicates
+        return self._duplicates(Counter(item["$oid"] for item in data))
+
+    @staticmethod
+    def _duplicates(counts: Counter) -> List:
+        """Find the values counted more than once
+
+        Args:
+            counts (Counter): Occurrences of each value
+
+        Returns:
+            List: List of duplicates
+        """
+        return [oid for oid, freq in counts.items() if freq > 1]
 
     def check_negative_values(self, data: Dict, path: str = "") -> Dict:
         """Check for negative values in JSON - Use primarily for Receipts
@@ -67,50 +223,99 @@ class DataQualityChecker:
             Dict: Dictionary of negative values
         """
         negative_values = {}
-
-        if isinstance(data, dict):
-            for key, value in data.items():
-                new_path = f"{path}.{key}" if path else key
-                if isinstance(value, (dict, list)):
-                    negative_values.update(self.check_negative_values(value, new_path))
-                else:
-                    try:
-                        num_value = float(value) if isinstance(value, str) else value
-                        if isinstance(num_value, (int, float)) and num_value < 0:
-                            negative_values[new_path] = num_value
-                    except (ValueError, TypeError):
-                        pass
-        elif isinstance(data, list):
-            for index, item in enumerate(data):
-                new_path = f"{path}[{index}]"
-                negative_values.update(self.check_negative_values(item, new_path))
+        # Paths are kept as tuples of keys and list indices and only joined
+        # into a string for the (rare) negative values
+        stack = [(data, (path,) if path else ())]
+
+        while stack:
+            node, parts = stack.pop()
+            if isinstance(node, dict):
+                # Pushed in reverse so values are reported in document order
+                for key, value in reversed(node.items()):
+                    stack.append((value, parts + (key,)))
+            elif isinstance(node, list):
+                for index in range(len(node) - 1, -1, -1):
+                    stack.append((node[index], parts + (index,)))
+            elif isinstance(node, (int, float)):
+                if node < 0:
+                    negative_values[self._format_path(parts)] = node
+            elif (
+                isinstance(node, str)
+                and node[:1] == "-"
+                and node[1:].replace(".", "", 1).isdecimal()
+            ):
+                negative_values[self._format_path(parts)] = float(node)
 
         return negative_values
 
+    @staticmethod
+    def _format_path(parts: tuple) -> str:
+        """Format a JSON path such as rewardsReceiptItemList[0].finalPrice
+
+        Args:
+            parts (tuple): Dict keys (str) and list indices (int) from the root
+
+        Returns:
+            str: The dotted path
+        """
+        path = ""
+        for part in parts:
+            if isinstance(part, int):
+                path = f"{path}[{part}]"
+            else:
+                path = f"{path}.{part}" if path else part
+        return path
+
     def check_json_quality(self) -> None:
-        """Check the quality of the JSON data"""
-        if not self.data:
+        """Check the quality of the JSON data in a single pass over the records"""
+        if self.data is None:
             return
 
-        expected_keys = set(self.data[0].keys())
+        records = iter(self.data)
+        sample = list(itertools.islice(records, _SCHEMA_SAMPLE_SIZE))
+        if not sample:
+            return
 
-        for index, item in enumerate(self.data):
-            self.check_item(item, index, expected_keys)
+        expected_keys = _ENTITY_SCHEMAS.get(self.entity)
+        required_keys = None
+        if expected_keys is None:
+            # Keys seen in every sampled record are required, the rest optional
+            expected_keys = set().union(*(record.keys() for record in sample))
+            required_keys = set(sample[0].keys()).intersection(
+                *(record.keys() for record in sample[1:])
+            )
+        self._oid_counts = Counter()
+        self._negative_items = 0
 
-        self.check_id_uniqueness(expected_keys)
+        for index, item in enumerate(itertools.chain(sample, records)):
+            self.check_item(item, index, expected_keys, required_keys)
 
-        logger.info("Data quality check completed")
+        if not self._negative_items:
+            logger.info("No negative values found in %s.", self.entity)
+        self.check_id_uniqueness()
 
-    def check_item(self, item: Dict, index: int, expected_keys: set) -> None:
+        logger.info("Data quality check completed for %s", self.entity)
+
+    def check_item(
+        self, item: Dict, index: int, expected_keys: set, required_keys: set = None
+    ) -> None:
         """Check item in the JSON
 
         Args:
             item (Dict): Json item to check
             index (int): The index of the item in the JSON
             expected_keys (set): The set expected keys in the JSON
+            required_keys (set, optional): The keys every item must have.
+                Defaults to None, which requires all of expected_keys.
         """
+        if "_id" in item and isinstance(item["_id"], dict):
+            oid = item["_id"].get("$oid")
+            # Malformed ids are reported by check_id_type instead
+            if isinstance(oid, str):
+                self._oid_counts[oid] += 1
+
         self.check_negative_values_in_item(item)
-        self.check_schema_consistency(item, index, expected_keys)
+        self.check_schema_consistency(item, index, expected_keys, required_keys)
         self.check_field_types(item, index)
 
     def check_negative_values_in_item(self, item: Dict) -> None:
@@ -120,26 +325,34 @@ class DataQualityChecker:
             item (Dict): The item to check for negative values
         """
         result = self.check_negative_values(item)
-        result.update(self.check_negative_values(item, path="rewardsReceiptItemList"))
 
         if result:
-            logger.warning("Negative values found:")
+            self._negative_items += 1
+            # Every line names its entity, as parallel workers share the log
+            logger.warning("Negative values found in %s", self.entity)
             for key, value in result.items():
-                logger.info(f"{key}: {value}")
-        else:
-            logger.info(f"No negative values found in {self.entity}.")
+                logger.info("Negative value in %s - %s: %s", self.entity, key, value)
 
-    def check_schema_consistency(self, item: Dict, index: int, expected_keys: set):
+    def check_schema_consistency(
+        self, item: Dict, index: int, expected_keys: set, required_keys: set = None
+    ):
         """Check schema consistency
 
         Args:
             item (Dict): The item to check for schema consistency
             index (int): The index of the item in the JSON
             expected_keys (set): The set expected keys in the JSON
+            required_keys (set, optional): The keys every item must have.
+                Defaults to None, which requires all of expected_keys.
         """
-        if set(item.keys()) != expected_keys:
+        keys = item.keys()
+        if required_keys is None:
+            consistent = keys == expected_keys
+        else:
+            consistent = required_keys <= keys <= expected_keys
+        if not consistent:
             logger.warning(
-                f"Inconsistent schema in {self.entity} at line number {index}"
+                "Inconsistent schema in %s at line number %s", self.entity, index
             )
 
     def check_field_types(self, item: Dict, index: int) -> None:
@@ -149,18 +362,13 @@ class DataQualityChecker:
             item (Dict): The item to check for field types
             index (int): The index of the item in the JSON
         """
+        dispatch = self._type_dispatch
         for key, value in item.items():
-            if isinstance(value, str):
-                self.check_date_format(item, index)
-            elif isinstance(value, (int, float)):
-                self.check_negative_numeric_fields(key, value, index)
-            elif isinstance(value, list):
-                self.check_empty_list(key, value, index)
-            elif value is None:
-                logger.warning(
-                    f"Null value for {key} found in {self.entity} at line number {index}"
-                )
+            handler = dispatch.get(type(value))
+            if handler is not None:
+                handler(key, value, index)
 
+        self.check_date_format(item, index)
         self.check_id_type(item, index)
 
     def check_date_format(self, item: Dict, index: int) -> None:
@@ -170,42 +378,39 @@ class DataQualityChecker:
             item (Dict): The json item to check for date format in
             index (int): The index of the item in the JSON
         """
+        # Only Receipts and Users has date fields
+        required = _REQUIRED_DATE_FIELDS.get(self.entity, frozenset())
 
-        # The fields order matter - DO NOT CHANGE!
-        date_fields = [
-            "lastLogin",
-            "createDate",
-            "dateScanned",
-            "finishedDate",
-            "modifyDate",
-            "pointsAwardedDate",
-            "purchaseDate",
-        ]
-
-        for field in date_fields:
+        for field in _DATE_FIELDS:
             if field in item:
                 if isinstance(item[field], dict) and "$date" in item[field]:
                     timestamp = item[field]["$date"]
-                    try:
+                    if type(timestamp) not in (int, float) or not (
+                        0 <= timestamp < _MAX_TIMESTAMP_MS
+                    ):
+                        logger.warning(
+                            "%s: Invalid date format in %s", field, self.entity
+                        )
+                    elif logger.isEnabledFor(logging.INFO):
                         # Convert milliseconds to seconds
                         date = datetime.fromtimestamp(timestamp / 1000)
-                        logger.info(f"{field}: Valid date - {date} in {self.entity}")
-                    except (ValueError, TypeError, OverflowError):
-                        logger.warning(f"{field}: Invalid date format in {self.entity}")
+                        logger.info(
+                            "%s: Valid date - %s in %s", field, date, self.entity
+                        )
                 else:
                     logger.warning(
-                        f"{field}: Incorrect date format found in {self.entity} at line number {index} (expected {{'$date': timestamp}})"
-                    )
-            else:
-                # Only Receipts and Users has date fields
-                if self.entity == "receipts" and field in date_fields[1:]:
-                    logger.warning(
-                        f"Missing date field '{field}' in receipts data at line number {index}"
-                    )
-                elif self.entity == "users" and field in date_fields[:1]:
-                    logger.warning(
-                        f"Missing date field '{field}' in users data at line number {index}"
+                        "%s: Incorrect date format found in %s at line number %s (expected {'$date': timestamp})",
+                        field,
+                        self.entity,
+                        index,
                     )
+            elif field in required:
+                logger.warning(
+                    "Missing date field '%s' in %s data at line number %s",
+                    field,
+                    self.entity,
+                    index,
+                )
 
     def check_negative_numeric_fields(self, key: str, value: Any, index: int) -> None:
         """Check negative numeric fields
@@ -215,15 +420,12 @@ class DataQualityChecker:
             value (Any): The value of the item to check for negative numeric fields
             index (int): The index of the item in the JSON
         """
-        if (
-            any(
-                indicator in key.lower()
-                for indicator in ["count", "amount", "price", "quantity"]
-            )
-            and value < 0
-        ):
+        if value < 0 and self._NEGATIVE_FIELD_RE.search(key):
             logger.warning(
-                f"Negative value for {key} found in {self.entity} at line number  {index}"
+                "Negative value for %s found in %s at line number  %s",
+                key,
+                self.entity,
+                index,
             )
 
     def check_empty_list(self, key: str, value: Any, index: int) -> None:
@@ -236,9 +438,24 @@ class DataQualityChecker:
         """
         if not value:
             logger.warning(
-                f"Empty list for {key} in {self.entity} at line number {index}"
+                "Empty list for %s in %s at line number %s", key, self.entity, index
             )
 
+    def check_null_value(self, key: str, value: Any, index: int) -> None:
+        """Report a null value - dispatched from check_field_types for None only
+
+        Args:
+            key (str): The key of the item with the null value
+            value (Any): The null value, unused but kept for the dispatch signature
+            index (int): The index of the item in the JSON
+        """
+        logger.warning(
+            "Null value for %s found in %s at line number %s",
+            key,
+            self.entity,
+            index,
+        )
+
     def check_id_type(self, item: Dict, index: int) -> None:
         """Check id type
 
@@ -249,25 +466,24 @@ class DataQualityChecker:
         if "_id" in item:
             if not isinstance(item["_id"], dict) or "$oid" not in item["_id"]:
                 logger.warning(
-                    f"Invalid _id type found in {self.entity} at line number {index}"
+                    "Invalid _id type found in %s at line number %s",
+                    self.entity,
+                    index,
                 )
             elif not isinstance(item["_id"]["$oid"], str):
                 logger.warning(
-                    f"Invalid $oid type in _id in {self.entity} at line number {index}"
+                    "Invalid $oid type in _id in %s at line number %s",
+                    self.entity,
+                    index,
                 )
 
-    def check_id_uniqueness(self, expected_keys: set) -> None:
-        """Check id uniqueness
-
-        Args:
-            expected_keys (set): The set expected keys in the JSON
-        """
-        if "_id" in expected_keys:
-            ids = [item["_id"] for item in self.data if "_id" in item]
-            duplicate_oids = self.find_duplicates(ids)
+    def check_id_uniqueness(self) -> None:
+        """Check id uniqueness of the ids counted while checking the items"""
+        if self._oid_counts:
+            duplicate_oids = self._duplicates(self._oid_counts)
             if duplicate_oids:
-                logger.warning(f"Duplicate OIDs found in {self.entity}")
+                logger.warning("Duplicate OIDs found in %s", self.entity)
                 for oid in duplicate_oids:
-                    logger.info(oid)
+                    logger.info("Duplicate OID in %s: %s", self.entity, oid)
             else:
-                logger.info(f"No duplicates found in {self.entity}.")
+                logger.info("No duplicates found in %s.", self.entity)
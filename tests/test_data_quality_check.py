@@ -38,6 +38,30 @@ class TestDataQualityChecker:
     def test_load_data(self, data_quality_checker):
         assert len(data_quality_checker.data) == 4
 
+    def test_load_data_json_array(self, tmp_path):
+        array_file = tmp_path / "brands.json"
+        array_file.write_text(
+            json.dumps([{"_id": {"$oid": "1"}}, {"_id": {"$oid": "2"}}], indent=2)
+        )
+        checker = DataQualityChecker(str(array_file))
+        checker.load_data()
+        assert checker.data == [{"_id": {"$oid": "1"}}, {"_id": {"$oid": "2"}}]
+
+    def test_load_data_json_array_ijson(self, tmp_path, caplog):
+        ijson = pytest.importorskip("ijson")
+        array_file = tmp_path / "receipts.json"
+        array_file.write_text(json.dumps([{"totalSpent": 26.5}, {"totalSpent": -1}]))
+        checker = DataQualityChecker(str(array_file))
+        checker.load_data()
+        assert checker.data == [{"totalSpent": 26.5}, {"totalSpent": -1}]
+        assert type(checker.data[0]["totalSpent"]) is float
+
+        array_file.write_text('[{"totalSpent": 26.5}, {"totalSpent": ')
+        checker = DataQualityChecker(str(array_file))
+        with pytest.raises(ijson.JSONError):
+            checker.load_data()
+        assert "Invalid JSON structure in receipts" in caplog.text
+
     def test_find_duplicates(self, data_quality_checker):
         duplicates = data_quality_checker.find_duplicates(
             [item["_id"] for item in data_quality_checker.data]
@@ -50,6 +74,29 @@ class TestDataQualityChecker:
         )
         assert negative_values == {"value": -5}
 
+    def test_check_negative_values_nested(self, data_quality_checker):
+        negative_values = data_quality_checker.check_negative_values(
+            {
+                "pointsEarned": "-500.0",
+                "description": "-ITEM",
+                "rewardsReceiptItemList": [{"finalPrice": "1.00"}, {"quantity": -2}],
+            }
+        )
+        assert negative_values == {
+            "pointsEarned": -500.0,
+            "rewardsReceiptItemList[1].quantity": -2,
+        }
+
+    def test_check_negative_values_in_item(
+        self, data_quality_checker, caplog, temp_json_file
+    ):
+        caplog.set_level(logging.INFO)
+        data_quality_checker.check_negative_values_in_item(data_quality_checker.data[1])
+        tmp_file_name = os.path.splitext(os.path.basename(temp_json_file))[0]
+        assert f"Negative values found in {tmp_file_name}" in caplog.text
+        assert f"Negative value in {tmp_file_name} - value: -5" in caplog.text
+        assert "\n" not in caplog.records[-1].getMessage()
+
     def test_check_json_quality(self, data_quality_checker, caplog):
         caplog.set_level(logging.INFO)
         data_quality_checker.check_json_quality()
@@ -65,12 +112,82 @@ class TestDataQualityChecker:
         )
         assert f"Inconsistent schema in {tmp_file_name} at line number 0" in caplog.text
 
+    def test_check_json_quality_declared_schema(self, tmp_path, caplog):
+        users_file = tmp_path / "users.json"
+        full_user = {
+            "_id": {"$oid": "1"},
+            "active": True,
+            "createdDate": {"$date": 1609687444800},
+            "lastLogin": {"$date": 1609687537858},
+            "role": "consumer",
+            "signUpSource": "Email",
+            "state": "WI",
+        }
+        sparse_user = {"_id": {"$oid": "2"}, "active": True, "role": "consumer"}
+        users_file.write_text(
+            "\n".join(json.dumps(user) for user in (sparse_user, full_user)) + "\n"
+        )
+        checker = DataQualityChecker(str(users_file))
+        checker.load_data()
+        checker.check_json_quality()
+        assert "Inconsistent schema in users at line number 0" in caplog.text
+        assert "Inconsistent schema in users at line number 1" not in caplog.text
+
+    def test_check_json_quality_sampled_schema(self, tmp_path, caplog):
+        sampled_file = tmp_path / "sampled.json"
+        records = [
+            {"_id": {"$oid": "1"}, "name": "a"},
+            {"_id": {"$oid": "2"}, "name": "b", "brandCode": "B"},
+            {"_id": {"$oid": "3"}, "name": "c"},
+            {"_id": {"$oid": "4"}},
+        ]
+        sampled_file.write_text("\n".join(json.dumps(r) for r in records) + "\n")
+        checker = DataQualityChecker(str(sampled_file))
+        checker.load_data()
+        checker.check_json_quality()
+        # Only _id is in every sampled record; name and brandCode are optional
+        for index in range(len(records)):
+            assert f"sampled at line number {index}" not in caplog.text
+
+        checker.check_schema_consistency(
+            {"_id": {"$oid": "5"}, "extra": 1}, 5, {"_id", "name"}, {"_id"}
+        )
+        checker.check_schema_consistency({"name": "e"}, 6, {"_id", "name"}, {"_id"})
+        assert "Inconsistent schema in sampled at line number 5" in caplog.text
+        assert "Inconsistent schema in sampled at line number 6" in caplog.text
+
     def test_check_date_format(self, data_quality_checker, caplog):
         caplog.set_level(logging.INFO)
         item_with_date = data_quality_checker.data[3]
         data_quality_checker.check_date_format(item_with_date, 3)
         assert "createDate: Valid date - 2021-01-29 15:24:58.184000" in caplog.text
 
+    def test_check_date_format_field_order(self, data_quality_checker, caplog):
+        data_quality_checker.check_date_format(
+            {"purchaseDate": "2021-01-01", "createDate": "2021-01-01"}, 6
+        )
+        messages = [record.getMessage() for record in caplog.records]
+        assert messages[0].startswith("createDate: Incorrect date format")
+        assert messages[1].startswith("purchaseDate: Incorrect date format")
+
+    def test_check_date_format_invalid_timestamp(self, data_quality_checker, caplog):
+        data_quality_checker.check_date_format(
+            {"createDate": {"$date": "yesterday"}, "modifyDate": {"$date": 10**15}}, 4
+        )
+        assert "createDate: Invalid date format" in caplog.text
+        assert "modifyDate: Invalid date format" in caplog.text
+
+    def test_check_field_types_checks_dates_once(self, data_quality_checker, caplog):
+        caplog.set_level(logging.INFO)
+        item = {
+            "_id": {"$oid": "5"},
+            "role": "consumer",
+            "state": "WI",
+            "createDate": {"$date": 1611955498184},
+        }
+        data_quality_checker.check_field_types(item, 5)
+        assert caplog.text.count("createDate: Valid date") == 1
+
     def test_check_negative_numeric_fields(
         self, data_quality_checker, caplog, temp_json_file
     ):
@@ -81,10 +198,37 @@ class TestDataQualityChecker:
             in caplog.text
         )
 
-    def test_check_id_uniqueness(self, data_quality_checker, caplog):
+    def test_check_id_uniqueness(self, data_quality_checker, caplog, temp_json_file):
+        caplog.set_level(logging.INFO)
         expected_keys = set(data_quality_checker.data[0].keys())
-        data_quality_checker.check_id_uniqueness(expected_keys)
+        for index, item in enumerate(data_quality_checker.data):
+            data_quality_checker.check_item(item, index, expected_keys)
+        data_quality_checker.check_id_uniqueness()
+        tmp_file_name = os.path.splitext(os.path.basename(temp_json_file))[0]
+        assert f"Duplicate OIDs found in {tmp_file_name}" in caplog.text
+        assert f"Duplicate OID in {tmp_file_name}: 1" in caplog.text
+
+    def test_check_json_quality_malformed_oid(self, tmp_path, caplog):
+        malformed_file = tmp_path / "malformed.json"
+        malformed_file.write_text(
+            json.dumps({"_id": {"$oid": ["a"]}})
+            + "\n"
+            + json.dumps({"_id": {"$oid": "b"}})
+            + "\n"
+        )
+        checker = DataQualityChecker(str(malformed_file))
+        checker.load_data()
+        checker.check_json_quality()
+        assert "Invalid $oid type in _id in malformed at line number 0" in caplog.text
+
+    def test_check_json_quality_streaming(self, temp_json_file, caplog):
+        caplog.set_level(logging.INFO)
+        checker = DataQualityChecker(temp_json_file)
+        checker.load_data(stream=True)
+        assert not isinstance(checker.data, list)
+        checker.check_json_quality()
         assert "Duplicate OIDs found" in caplog.text
+        assert "Data quality check completed" in caplog.text
 
     def test_invalid_json_file(self):
         with tempfile.NamedTemporaryFile(